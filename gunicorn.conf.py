@@ -0,0 +1,17 @@
+# Gunicorn settings, picked up automatically by `gunicorn main:app`
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Requests spend most of their time waiting on Google Translate,
+# so threaded workers overlap that I/O instead of queueing behind it.
+# WEB_CONCURRENCY / GUNICORN_THREADS override the defaults per instance.
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "32"))
+
+def post_fork(server, worker):
+    # Runs in each worker before it imports main.py. Exporting the thread count
+    # gunicorn settled on (config, --threads or GUNICORN_CMD_ARGS) lets main.py
+    # size its translate connection pool to match.
+    os.environ["GUNICORN_THREADS"] = str(worker.cfg.threads)
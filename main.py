@@ -1,77 +1,622 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import orjson
 import pandas as pd
-from deep_translator import GoogleTranslator
-from langdetect import detect
-import re
-from datetime import datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import requests
+from requests.adapters import HTTPAdapter
+import os
+import json
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import string
+import threading
+from functools import lru_cache
+from concurrent.futures import Future
+from typing import Callable, NamedTuple
+from array import array
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson instead of the stdlib json module."""
+
+    def _options(self, sort_keys=None, indent=None, separators=None, ensure_ascii=None, **kwargs):
+        # Map the json.dumps arguments orjson supports; refuse the rest rather than drop them.
+        # separators and ensure_ascii (Flask's session serializer passes them) are accepted
+        # as-is: orjson output is always compact UTF-8.
+        if kwargs:
+            raise TypeError(f"orjson does not support: {', '.join(kwargs)}")
+        # Let the provider's default turn dates into HTTP dates, as Flask does
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            if indent != 2:
+                raise ValueError("orjson only supports indent=2")
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        default = kwargs.pop("default", self.default)
+        return orjson.dumps(obj, default=default, option=self._options(**kwargs)).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            raise TypeError(f"orjson does not support: {', '.join(kwargs)}")
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Pretty-print in debug mode or when compact is off, like the default provider
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._options(indent=2 if pretty else None) | orjson.OPT_APPEND_NEWLINE
+        # orjson already returns UTF-8 bytes, so skip the str round trip
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Log records are handed to a background thread for writing, so request
+# threads never block on stderr. The QueueHandler formats each record
+# before queueing it, so the listener's handler just writes the message.
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+
+# Set LOG_LEVEL=DEBUG to see per-request query/response details
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
 
 # --------------------------
 # Load dataset
 # --------------------------
-# Load all columns as strings to preserve Excel display
-books_df = pd.read_excel("Books.xlsx", dtype=str)
+# Years (yyyy) and year-months (yyyy-mm) are kept as-is; one pattern means one pass
+YEAR_OR_YEAR_MONTH = r"\d{4}(?:-\d{1,2})?"
 
 # Convert Excel serial numbers in 'published_date' column to readable format
-def excel_date_to_str(date_str):
+def excel_dates_to_str(dates):
     """
-    Convert Excel serial numbers to dd/mm/yyyy.
+    Convert Excel serial numbers to dd/mm/yyyy, a whole column at a time.
     Keep original string if it's year-only (yyyy) or year-month (yyyy-mm).
     """
-    if pd.isna(date_str):
-        return ""
-    
-    s = str(date_str).strip()
-    
-    # If it's exactly 4 digits, assume it's a year
-    if re.fullmatch(r"\d{4}", s):
-        return s
-    
-    # If it's yyyy-mm format, keep as-is
-    if re.fullmatch(r"\d{4}-\d{1,2}", s):
-        return s
-    
-    # Try to convert Excel serial to date
+    s = dates.fillna("").astype(str).str.strip()
+
+    keep = s.str.fullmatch(YEAR_OR_YEAR_MONTH)
+
+    # Skip Excel's leap-year bug (<= 59) and serials beyond pandas' Timestamp range
+    serials = pd.to_numeric(s.where(~keep), errors="coerce")
+    serials = serials.where((serials > 59) & (serials < 106751))
+    converted = (pd.Timestamp("1899-12-30") + pd.to_timedelta(np.floor(serials), unit="D")).dt.strftime("%d/%m/%Y")
+
+    # Otherwise, keep as string
+    return converted.where(serials.notna(), s)
+
+BOOKS_XLSX = "Books.xlsx"
+# Bump whenever the cleaning in load_books() or BOOK_DTYPE changes: caches
+# written in an older format then go unread and are rebuilt from the workbook.
+BOOKS_CACHE_VERSION = 2
+BOOKS_PARQUET = f"Books.v{BOOKS_CACHE_VERSION}.parquet"
+
+# Arrow-backed strings: each column is one UTF-8 buffer rather than a Python
+# object per cell, and .str methods run in Arrow's kernels. Missing cells
+# stay NaN, as with dtype=str.
+BOOK_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+def load_books():
+    """
+    Load the catalogue, reusing a cleaned Parquet copy of the workbook when it is newer.
+    """
+    if os.path.exists(BOOKS_PARQUET) and os.path.getmtime(BOOKS_PARQUET) >= os.path.getmtime(BOOKS_XLSX):
+        try:
+            return pd.read_parquet(BOOKS_PARQUET, engine="pyarrow").astype(BOOK_DTYPE)
+        except:
+            pass  # unreadable cache: rebuild it from the workbook
+
+    # Load all columns as strings to preserve Excel display
+    df = pd.read_excel(BOOKS_XLSX, dtype=str)
+    # Clean dates before caching so later startups skip the conversion
+    df["published_date"] = excel_dates_to_str(df["published_date"])
+    df = df.astype(BOOK_DTYPE)
     try:
-        val = float(s)
-        if val > 59:  # skip Excel leap-year bug
-            dt = datetime(1899, 12, 30) + timedelta(days=int(val))
-            return dt.strftime("%d/%m/%Y")
+        # Write under a temporary name so other workers never read a partial file
+        tmp_path = f"{BOOKS_PARQUET}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, engine="pyarrow", index=False)
+        os.replace(tmp_path, BOOKS_PARQUET)
     except:
-        pass
-    
-    # Otherwise, keep as string
-    return s
+        pass  # read-only filesystem: keep serving from the workbook
+    return df
+
+books_df = load_books()
+
+# Lowercased copies of the searchable columns as Arrow string arrays, built
+# once instead of per request. The columns are already Arrow-backed, so this
+# takes the lowered buffers as-is, and match_substring scans them in C++.
+LOWERED = {
+    col: pa.array(books_df[col].fillna("").str.lower())
+    for col in ("title", "author", "genre")
+}
+
+# Plain row dicts for handlers that just need one book
+books_records = books_df.to_dict("records")
+
+# One array per field, for positional access without pandas' indexers
+BOOK_FIELDS = ("title", "author", "genre", "publisher", "published_date",
+               "pages", "average_rating", "description", "thumbnail")
+COLS = {c: books_df[c].to_numpy() for c in BOOK_FIELDS}
+
+# Rows sharing the highest average rating, found once instead of per request
+ratings = pd.to_numeric(books_df["average_rating"], errors="coerce")
+TOP_RATED_ROWS = np.flatnonzero((ratings == ratings.max()).to_numpy(dtype=bool)).tolist()
+
+# --------------------------
+# Search index
+# --------------------------
+def build_trigram_index(values):
+    """
+    Map every trigram to the (ascending) row positions of the values containing it.
+    """
+    index = {}
+    for i, value in enumerate(values):
+        for gram in {value[j:j + 3] for j in range(len(value) - 2)}:
+            index.setdefault(gram, array("i")).append(i)
+    return index
+
+def candidate_rows(index, query):
+    """
+    Return the sorted row positions that contain every trigram of the query.
+    Returns None when the query is too short for the index to help.
+    """
+    if len(query) < 3:
+        return None
+    postings = []
+    for gram in {query[j:j + 3] for j in range(len(query) - 2)}:
+        rows = index.get(gram)
+        if rows is None:
+            return []
+        postings.append(rows)
+    postings.sort(key=len)
+    candidates = set(postings[0])
+    for rows in postings[1:]:
+        candidates.intersection_update(rows)
+        if not candidates:
+            break
+    return sorted(candidates)
+
+search_indexes = {col: build_trigram_index(values.to_pylist()) for col, values in LOWERED.items()}
 
-books_df["published_date"] = books_df["published_date"].apply(excel_date_to_str)
+# --------------------------
+# Response templates
+# --------------------------
+STATIC_RESPONSES = {
+    "greet": "Hello! 👋 Welcome to the Online Reading Club. How can I help you?",
+    "goodbye": "Goodbye! Happy reading 📖",
+    "bot_challenge": "I’m a book assistant bot 🤖, here to help you discover books!",
+}
+
+FALLBACK_RESPONSE = "Sorry, I didn’t get that."
+
+# Not-found replies, filled in with the user's search term
+NOT_FOUND_TITLE = "Sorry, I couldn’t find a book titled '{}'."
+NOT_FOUND_AUTHOR = "Sorry, I couldn’t find books from {}."
+NOT_FOUND_GENRE = "Sorry, I couldn’t find books in the {} genre."
+NOT_FOUND_PAGES = "Sorry, I couldn’t find page count for '{}'."
+NOT_FOUND_DESCRIPTION = "Sorry, I couldn’t find a description for '{}'."
+NOT_FOUND_PUBLISH_DATE = "Sorry, I couldn’t find the published date for '{}'."
+NOT_FOUND_PUBLISHER = "Sorry, I couldn’t find the publisher for '{}'."
+NOT_FOUND_RATING = "Sorry, I couldn’t find ratings for '{}'."
+NOT_FOUND_THUMBNAIL = "Sorry, I couldn’t find a cover for '{}'."
+
+# Single-field replies, filled in from the matched book's row
+FOUND_PAGES = "📄'{title}' has {pages} pages."
+FOUND_DESCRIPTION = "📝 Description of '{title}': {description}"
+FOUND_PUBLISH_DATE = "📅'{title}' was published on {published_date}."
+FOUND_PUBLISHER = "🏢 Publisher of '{title}' is {publisher}."
+FOUND_RATING = "⭐'{title}' has an average rating of {average_rating}."
+FOUND_THUMBNAIL = "📌 Thumbnail for '{title}': {thumbnail}: "
+
+# Full-book details, bound to format_map once at import
+BOOK_DETAILS = """📖 Title: {title}
+👤 Author: {author}
+📚 Genre: {genre}
+🏢 Publisher: {publisher}
+📅 Published Date: {published_date}
+📄 Pages: {pages}
+⭐ Average Rating: {average_rating}
+📝 Description: {description}
+📌 Thumbnail: {thumbnail}""".format_map
+
+BOOK_FOUND_HEADER = "Here is the book 📕 for you!"
+BOOK_RECOMMENDATION_HEADER = "I recommend this book 📙 for you:"
+
+# Languages the canned responses are translated into at startup. Each one costs
+# API calls in every worker, so only list codes safe_detect_language() returns
+# in practice: Indonesian, Malay and other plain-ASCII text is answered as "en".
+# No traffic figures are kept in this repo; base overrides on the "Detected
+# lang" debug line from production logs (e.g. WARM_LANGUAGES=ta,ja). Tamil is
+# the default because its script alone identifies it.
+WARM_LANGUAGES = tuple(lang for lang in os.environ.get("WARM_LANGUAGES", "ta").split(",") if lang)
 
 # --------------------------
 # Translation
 # --------------------------
+# deep_translator calls requests.get() for every translation, opening a new
+# connection each time. Its module is pointed at one keep-alive session instead.
+TRANSLATE_TIMEOUT = 5  # seconds; deep_translator passes no timeout of its own
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = TRANSLATE_TIMEOUT
+        return super().send(request, **kwargs)
+
+# One pooled connection per gunicorn thread, so none are dropped under load.
+# gunicorn.conf.py's post_fork hook exports each worker's thread count as
+# GUNICORN_THREADS; outside gunicorn, requests' own pool size is used.
+translate_session = requests.Session()
+translate_session.mount("https://", TimeoutHTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=int(os.environ.get("GUNICORN_THREADS", requests.adapters.DEFAULT_POOLSIZE))))
+
+# deep_translator pulls in bs4 and friends, so it is only imported on first use
+_translators = threading.local()
+
+def _get_translator(source: str, target: str):
+    """
+    Return this thread's GoogleTranslator for a language pair, creating it on first use.
+    Instances are not shared across threads because translate() stores the query on the instance.
+    """
+    by_pair = getattr(_translators, "by_pair", None)
+    if by_pair is None:
+        by_pair = _translators.by_pair = {}
+    translator = by_pair.get((source, target))
+    if translator is None:
+        import deep_translator.google
+        deep_translator.google.requests = translate_session
+        translator = by_pair[(source, target)] = deep_translator.google.GoogleTranslator(source=source, target=target)
+    return translator
+
+# Cache misses currently being fetched. Concurrent requests for the same
+# text wait on the first caller's round trip instead of each making their own.
+_in_flight: dict[tuple[str, str, str], Future] = {}
+_in_flight_lock = threading.Lock()
+
+def _fetch_translation(text: str, source: str, target: str) -> str:
+    key = (text, source, target)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if leader:
+        try:
+            future.set_result(_get_translator(source, target).translate(text))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with _in_flight_lock:
+                del _in_flight[key]
+    return future.result()
+
+@lru_cache(maxsize=4096)
+def _translate(text: str, source: str, target: str) -> str:
+    # Failed calls raise, so only successful translations are cached
+    return _fetch_translation(text, source, target)
+
 def translate_to_english(text: str) -> str:
     try:
-        return GoogleTranslator(source="auto", target="en").translate(text)
+        return _translate(text, "auto", "en")
     except:
         return text
 
 def translate_back(text: str, target_lang: str) -> str:
+    if target_lang == "en":
+        return text
     try:
-        if target_lang != "en":
-            return GoogleTranslator(source="en", target=target_lang).translate(text)
+        return _translate(text, "en", target_lang)
+    except:
         return text
+
+# Canned replies already translated, as {lang: {english_text: text}}. Keyed by
+# the English source so editing STATIC_RESPONSES retires its old translations.
+# Kept outside the LRU so they are never evicted, and saved on exit so restarts
+# skip the API.
+STATIC_TRANSLATIONS_FILE = "static_translations.json"
+
+def load_static_translations():
+    """
+    Read the saved translations, keeping only those of the current English replies.
+    """
+    current = set(STATIC_RESPONSES.values())
+    try:
+        with open(STATIC_TRANSLATIONS_FILE, encoding="utf-8") as f:
+            saved = json.load(f)
+        return {
+            lang: {source: text for source, text in entries.items() if source in current}
+            for lang, entries in saved.items()
+        }
+    except:
+        return {}
+
+def save_static_translations():
+    try:
+        # Every worker saves on exit; merge with the file so the others' entries survive
+        merged = load_static_translations()
+        for lang, entries in static_translations.items():
+            merged.setdefault(lang, {}).update(entries)
+        tmp_path = f"{STATIC_TRANSLATIONS_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False)
+        os.replace(tmp_path, STATIC_TRANSLATIONS_FILE)
     except:
+        pass  # read-only filesystem: they'll be translated again next time
+
+static_translations = load_static_translations()
+atexit.register(save_static_translations)
+
+def static_response(intent: str, lang: str) -> str:
+    text = STATIC_RESPONSES[intent]
+    if lang == "en":
         return text
+    translated = static_translations.get(lang, {}).get(text)
+    if translated is None:
+        translated = translate_back(text, lang)
+        # translate_back falls back to English on errors; don't pin that
+        if translated != text:
+            static_translations.setdefault(lang, {})[text] = translated
+    return translated
+
+# Serialized webhook bodies for the canned replies, keyed by (intent, lang)
+static_payloads = {}
+
+def static_payload(intent: str, lang: str) -> bytes:
+    payload = static_payloads.get((intent, lang))
+    if payload is None:
+        text = static_response(intent, lang)
+        # Same body jsonify() would build, serialized once
+        payload = app.json.response({"fulfillmentText": text}).get_data()
+        # Only pin replies that are final: English, or a stored translation
+        if lang == "en" or STATIC_RESPONSES[intent] in static_translations.get(lang, {}):
+            static_payloads[(intent, lang)] = payload
+    return payload
+
+def warm_translation_cache():
+    for lang in WARM_LANGUAGES:
+        for intent in STATIC_RESPONSES:
+            static_payload(intent, lang)
+
+for intent in STATIC_RESPONSES:
+    static_payload(intent, "en")
+
+# Warm in the background so startup doesn't wait on the network
+threading.Thread(target=warm_translation_cache, daemon=True).start()
+
+# --------------------------
+# Language detection
+# --------------------------
+# Unicode blocks whose script is only used by one language (langdetect codes).
+# Han characters alone are left to langdetect, which tells zh-cn from zh-tw.
+SCRIPT_LANGUAGES = (
+    (0x3040, 0x30FF, "ja"),  # Hiragana, Katakana
+    (0xAC00, 0xD7AF, "ko"),  # Hangul syllables
+    (0x0E00, 0x0E7F, "th"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0370, 0x03FF, "el"),
+    (0x0590, 0x05FF, "he"),
+)
+
+# Text made only of these is answered as English without running langdetect:
+# ASCII letters, digits, whitespace and light punctuation. ASCII with other
+# symbols (":", "(", "/", ...) still goes to langdetect, as it always has.
+ENGLISH_CHARS = frozenset(string.ascii_letters + string.digits + string.whitespace + "?!',.-")
+
+def guess_language_by_script(text: str):
+    for ch in text:
+        cp = ord(ch)
+        for lo, hi, lang in SCRIPT_LANGUAGES:
+            if lo <= cp <= hi:
+                return lang
+    return None
 
 def safe_detect_language(text: str) -> str:
-    try:
-        lang = detect(text)
-        if re.fullmatch(r"[A-Za-z0-9\s\?\!\'\,\.\-]+", text):
-            return "en"
+    # Missing or non-string queryText is treated as English, as before
+    if not isinstance(text, str):
+        return "en"
+    if ENGLISH_CHARS.issuperset(text):
+        return "en"
+    lang = guess_language_by_script(text)
+    if lang:
         return lang
+    # Surrounding whitespace doesn't change the answer, so let it share a cache
+    # entry. Casing can: langdetect reads "ПРИВЕТ" as uk but "Привет" as bg.
+    return _detect(text.strip())
+
+@lru_cache(maxsize=4096)
+def _detect(text: str) -> str:
+    # Imported on first use, so workers that only see plain English queries never load it
+    from langdetect import detect
+    try:
+        return detect(text)
     except:
         return "en"
 
+# --------------------------
+# Search helper
+# --------------------------
+def match_mask(values, value):
+    return pc.match_substring(values, value).to_numpy(zero_copy_only=False)
+
+def search_rows(column, value):
+    """
+    Return the row positions whose column contains value, in row order.
+    value must already be lowercase.
+    """
+    lowered = LOWERED[column]
+    if column in search_indexes:
+        rows = candidate_rows(search_indexes[column], value)
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            return rows[match_mask(lowered.take(rows), value)]
+    return np.flatnonzero(match_mask(lowered, value))
+
+# Exact lowercased title -> first row with that title
+# (built back to front so duplicates keep their first row)
+title_positions = {title: i for i, title in reversed(list(enumerate(LOWERED["title"].to_pylist())))}
+
+def find_title(value):
+    """
+    Row of the book titled value, else of the first title containing it (None if neither).
+    value must already be lowercase.
+    """
+    i = title_positions.get(value)
+    if i is not None:
+        return i
+    hits = search_rows("title", value)
+    return int(hits[0]) if hits.size else None
+
+def format_book(i, header):
+    return f"{header}\n{BOOK_DETAILS(books_records[i])}"
+
+def answer_about_title(query, found, not_found):
+    """Fill `found` from the book titled in the query, or `not_found` with the search term."""
+    i = find_title(query.title_lc)
+    if i is not None:
+        return found.format_map(books_records[i])
+    return not_found.format(query.title)
+
+def numbered_titles(hits):
+    return "\n".join([f"{i+1}. {title}" for i, title in enumerate(COLS["title"][hits[:5]])])
+
+# First five matching titles for every author and genre in the catalogue,
+# so queries that name one exactly skip the scan
+TOP_TITLES = {
+    col: {value: numbered_titles(search_rows(col, value)) for value in set(LOWERED[col].to_pylist())}
+    for col in ("author", "genre")
+}
+
+def lookup_titles(column, value):
+    """
+    Numbered list of the first five titles whose column contains value ("" if none).
+    """
+    titles = TOP_TITLES[column].get(value)
+    if titles is None:
+        titles = numbered_titles(search_rows(column, value))
+    return titles
+
+# --------------------------
+# Intent handlers
+# --------------------------
+class BookQuery(NamedTuple):
+    """
+    Book parameters from Dialogflow, read and lowercased once per request.
+    """
+    title: str
+    author: str
+    genre: str
+    title_lc: str
+    author_lc: str
+    genre_lc: str
+
+def parse_query(params) -> BookQuery:
+    title = str(params.get("book_title", "")).strip()
+    author = str(params.get("author", "")).strip()
+    genre = str(params.get("genre", "")).strip()
+    return BookQuery(title, author, genre, title.lower(), author.lower(), genre.lower())
+
+# Each handler takes the request's BookQuery and returns the English reply.
+# greet/goodbye/bot_challenge need no handler: they are served from STATIC_RESPONSES.
+# The catalogue never changes after load, so handlers whose reply depends only on
+# the query are memoized. recommend_book and search_top_rated pick at random and are not.
+
+def handle_fallback(query):
+    return FALLBACK_RESPONSE
+
+@lru_cache(maxsize=8192)
+def handle_search_book_by_title(query):
+    if not query.title:
+        return FALLBACK_RESPONSE
+    i = find_title(query.title_lc)
+    if i is not None:
+        return format_book(i, BOOK_FOUND_HEADER)
+    return NOT_FOUND_TITLE.format(query.title)
+
+def handle_recommend_book(query):
+    if find_title(query.title_lc) is not None:
+        return format_book(random.randrange(len(books_records)), BOOK_RECOMMENDATION_HEADER)
+    return FALLBACK_RESPONSE
+
+@lru_cache(maxsize=8192)
+def handle_search_book_by_author(query):
+    if not query.author:
+        return "Please provide an author name."
+    titles = lookup_titles("author", query.author_lc)
+    if titles:
+        return f"📚 Here are some books by {query.author.title()}:\n{titles}"
+    return NOT_FOUND_AUTHOR.format(query.author)
+
+@lru_cache(maxsize=8192)
+def handle_search_book_by_genre(query):
+    titles = lookup_titles("genre", query.genre_lc)
+    if titles:
+        return f"📖 Found the following books in the '{query.genre.title()}' genre:\n{titles}"
+    return NOT_FOUND_GENRE.format(query.genre)
+
+@lru_cache(maxsize=8192)
+def handle_ask_number_of_pages(query):
+    return answer_about_title(query, FOUND_PAGES, NOT_FOUND_PAGES)
+
+@lru_cache(maxsize=8192)
+def handle_ask_book_description(query):
+    return answer_about_title(query, FOUND_DESCRIPTION, NOT_FOUND_DESCRIPTION)
+
+@lru_cache(maxsize=8192)
+def handle_ask_publish_date(query):
+    return answer_about_title(query, FOUND_PUBLISH_DATE, NOT_FOUND_PUBLISH_DATE)
+
+@lru_cache(maxsize=8192)
+def handle_ask_publisher(query):
+    return answer_about_title(query, FOUND_PUBLISHER, NOT_FOUND_PUBLISHER)
+
+@lru_cache(maxsize=8192)
+def handle_ask_average_rating(query):
+    return answer_about_title(query, FOUND_RATING, NOT_FOUND_RATING)
+
+def handle_search_top_rated(query):
+    if books_df.empty:
+        return "❌ I cannot provide top-rated books. The dataset is empty."
+
+    # Randomly sample up to 5 of the books sharing the highest rating
+    rows = random.sample(TOP_RATED_ROWS, min(5, len(TOP_RATED_ROWS)))
+
+    msg = "🏆 Top Rated Books:\n"
+    for i in rows:
+        msg += f"- {COLS['title'][i]} by {COLS['author'][i]} (⭐ {COLS['average_rating'][i]})\n"
+    return msg.strip()
+
+@lru_cache(maxsize=8192)
+def handle_ask_thumbnail(query):
+    return answer_about_title(query, FOUND_THUMBNAIL, NOT_FOUND_THUMBNAIL)
+
+INTENT_HANDLERS: dict[str, Callable[[BookQuery], str]] = {
+    "search_book_by_title": handle_search_book_by_title,
+    "recommend_book": handle_recommend_book,
+    "search_book_by_author": handle_search_book_by_author,
+    "search_book_by_genre": handle_search_book_by_genre,
+    "ask_number_of_pages": handle_ask_number_of_pages,
+    "ask_book_description": handle_ask_book_description,
+    "ask_publish_date": handle_ask_publish_date,
+    "ask_publisher": handle_ask_publisher,
+    "ask_average_rating": handle_ask_average_rating,
+    "search_top_rated": handle_search_top_rated,
+    "ask_thumbnail": handle_ask_thumbnail,
+}
+
 # --------------------------
 # Health check
 # --------------------------
@@ -89,214 +634,31 @@ def webhook():
     intent = req.get("queryResult", {}).get("intent", {}).get("displayName", "")
     params = req.get("queryResult", {}).get("parameters", {})
 
-    detected_lang = safe_detect_language(query_text)
-    translated_query = translate_to_english(query_text)
-
-    print("\n[DEBUG] -------------------------")
-    print(f"Original query   : {query_text}")
-    print(f"Translated query : {translated_query}")
-    print(f"Detected lang    : {detected_lang}")
-    print(f"Intent           : {intent}")
-    print("-------------------------------\n")
-
-    response_text = "Sorry, I didn’t get that."
-
-    # ----------------------
-    # Safe search helper
-    # ----------------------
-    def safe_search(column, value):
-        return books_df[books_df[column].str.lower().str.contains(re.escape(value.lower()), na=False, regex=True)]
-
-    # ----------------------
-    # Intent: greet
-    # ----------------------
-    if intent == "greet":
-        response_text = "Hello! 👋 Welcome to the Online Reading Club. How can I help you?"
-
-    # ----------------------
-    # Intent: goodbye
-    # ----------------------
-    elif intent == "goodbye":
-        response_text = "Goodbye! Happy reading 📖"
-
-    # ------------------------------
-    # Intent: bot_challenge
-    # ------------------------------
-    elif intent == "bot_challenge":
-        response_text = "I’m a book assistant bot 🤖, here to help you discover books!"
-
-    # -----------------------------
-    # Intent: search_book_by_title
-    # -----------------------------
-    elif intent == "search_book_by_title":
-        title = str(params.get("book_title", ""))
-        if title:
-            match = safe_search("title", title)
-            if not match.empty:
-                row = match.iloc[0]
-                response_text = f"""Here is the book 📕 for you!            
-📖 Title: {row['title']}
-👤 Author: {row['author']}
-📚 Genre: {row['genre']}
-🏢 Publisher: {row['publisher']}
-📅 Published Date: {row['published_date']}
-📄 Pages: {row['pages']}
-⭐ Average Rating: {row['average_rating']}
-📝 Description: {row['description']}
-📌 Thumbnail: {row['thumbnail']}"""
-            else:
-                response_text = f"Sorry, I couldn’t find a book titled '{title}'."
-
-    # -----------------------------
-    # Intent: recommend_book
-    # -----------------------------
-    elif intent == "recommend_book":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = books_df.sample(1).iloc[0]
-            response_text = f"""I recommend this book 📙 for you:
-📖 Title: {row['title']}
-👤 Author: {row['author']}
-📚 Genre: {row['genre']}
-🏢 Publisher: {row['publisher']}
-📅 Published Date: {row['published_date']}
-📄 Pages: {row['pages']}
-⭐ Average Rating: {row['average_rating']}
-📝 Description: {row['description']}
-📌 Thumbnail: {row['thumbnail']}"""
-
-    # ------------------------------
-    # Intent: search_book_by_author
-    # ------------------------------
-    elif intent == "search_book_by_author":
-        author = str(params.get("author", ""))
-        if author:
-            match = safe_search("author", author)
-            if not match.empty:
-                titles = "\n".join([f"{i+1}. {title}" for i, title in enumerate(match["title"].tolist()[:5])])
-                response_text = f"📚 Here are some books by {author.title()}:\n{titles}"
-            else:
-                response_text = f"Sorry, I couldn’t find books from {author}."
-        else:
-            response_text = "Please provide an author name."
-
-    # ------------------------------
-    # Intent: search_book_by_genre
-    # ------------------------------
-    elif intent == "search_book_by_genre":
-        genre = str(params.get("genre", ""))
-        match = safe_search("genre", genre)
-        if not match.empty:
-            titles = "\n".join([f"{i+1}. {title}" for i, title in enumerate(match["title"].tolist()[:5])])
-            response_text = f"📖 Found the following books in the '{genre.title()}' genre:\n{titles}"
-        else:
-            response_text = f"Sorry, I couldn’t find books in the {genre} genre."
-
-    # ------------------------------
-    # Intent: ask_number_of_pages
-    # ------------------------------
-    elif intent == "ask_number_of_pages":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"📄'{row['title']}' has {row['pages']} pages."
-        else:
-            response_text = f"Sorry, I couldn’t find page count for '{title}'."
-
-    # ------------------------------
-    # Intent: ask_book_description
-    # ------------------------------
-    elif intent == "ask_book_description":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"📝 Description of '{row['title']}': {row['description']}"
-        else:
-            response_text = f"Sorry, I couldn’t find a description for '{title}'."
+    query = parse_query(params)
 
-    # ------------------------------
-    # Intent: ask_publish_date
-    # ------------------------------
-    elif intent == "ask_publish_date":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"📅'{row['title']}' was published on {row['published_date']}."
-        else:
-            response_text = f"Sorry, I couldn’t find the published date for '{title}'."
+    detected_lang = safe_detect_language(query_text)
 
-    # ------------------------------
-    # Intent: ask_publisher
-    # ------------------------------
-    elif intent == "ask_publisher":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"🏢 Publisher of '{row['title']}' is {row['publisher']}."
-        else:
-            response_text = f"Sorry, I couldn’t find the publisher for '{title}'."
+    if logger.isEnabledFor(logging.DEBUG):
+        # Handlers match on Dialogflow's parameters, so the English query is
+        # only needed for this log line. English queries skip the round trip.
+        translated_query = query_text if detected_lang == "en" else translate_to_english(query_text)
+        logger.debug("Original query   : %s", query_text)
+        logger.debug("Translated query : %s", translated_query)
+        logger.debug("Detected lang    : %s", detected_lang)
+        logger.debug("Intent           : %s", intent)
 
-    # ------------------------------
-    # Intent: ask_average_rating
-    # ------------------------------
-    elif intent == "ask_average_rating":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"⭐'{row['title']}' has an average rating of {row['average_rating']}."
-        else:
-            response_text = f"Sorry, I couldn’t find ratings for '{title}'."
+    # Canned replies are served as pre-serialized bodies
+    if intent in STATIC_RESPONSES:
+        return Response(static_payload(intent, detected_lang), mimetype=app.json.mimetype)
 
-    # ------------------------------
-    # Intent: search_top_rated
-    # ------------------------------
-    elif intent == "search_top_rated":
-        if books_df.empty:
-            response_text = "❌ I cannot provide top-rated books. The dataset is empty."
-        else:
-            try:
-                # Ensure numeric ratings
-                books_df["average_rating"] = pd.to_numeric(books_df["average_rating"], errors="coerce")
-
-                # Get the maximum rating value
-                max_rating = books_df["average_rating"].max()
-
-                # Get all books with the highest rating
-                top_books = books_df[books_df["average_rating"] == max_rating]
-
-                # Randomly sample up to 5 books
-                top_books = top_books.sample(min(5, len(top_books)))
-
-                msg = "🏆 Top Rated Books:\n"
-                for _, row in top_books.iterrows():
-                    msg += f"- {row['title']} by {row['author']} (⭐ {row['average_rating']})\n"
-                response_text = msg.strip()
-            except Exception as e:
-                response_text = f"❌ Error fetching top rated books: {str(e)}"
-
-    # ------------------------------
-    # Intent: ask_thumbnail
-    # ------------------------------
-    elif intent == "ask_thumbnail":
-        title = str(params.get("book_title", ""))
-        match = safe_search("title", title)
-        if not match.empty:
-            row = match.iloc[0]
-            response_text = f"📌 Thumbnail for '{row['title']}': {row['thumbnail']}: "
-        else:
-            response_text = f"Sorry, I couldn’t find a cover for '{title}'."
+    response_text = INTENT_HANDLERS.get(intent, handle_fallback)(query)
 
     # ------------------------------
     # Translate back to user's language
     # ------------------------------
-    response_text = translate_back(response_text, detected_lang)
-    print(f"[DEBUG] Final response (before sending): {response_text}\n")
+    if detected_lang != "en":
+        response_text = translate_back(response_text, detected_lang)
+    logger.debug("Final response (before sending): %s", response_text)
 
     return jsonify({"fulfillmentText": response_text})
 
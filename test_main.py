@@ -0,0 +1,125 @@
+import atexit
+import os
+
+import pytest
+from deep_translator import GoogleTranslator
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --------------------------
+# Fixtures
+# --------------------------
+def fake_translate(self, text, **kwargs):
+    """Stand-in for Google Translate: tag the text with its target language."""
+    return f"[{self._target}] {text}"
+
+@pytest.fixture(scope="module")
+def client():
+    with pytest.MonkeyPatch.context() as mp:
+        # main.py loads Books.xlsx from the working directory and starts warming
+        # translations on import, so both have to be in place before importing it
+        mp.chdir(REPO_DIR)
+        mp.setattr(GoogleTranslator, "translate", fake_translate)
+        import main
+        # Don't write the fake translations to static_translations.json
+        atexit.unregister(main.save_static_translations)
+        yield main.app.test_client()
+
+def ask(client, intent, query_text="hello", **params):
+    res = client.post("/webhook", json={
+        "queryResult": {
+            "queryText": query_text,
+            "intent": {"displayName": intent},
+            "parameters": params,
+        }
+    })
+    assert res.status_code == 200
+    return res.get_json()["fulfillmentText"]
+
+# --------------------------
+# Canned replies
+# --------------------------
+def test_health_check(client):
+    res = client.get("/webhook")
+    assert res.status_code == 200
+    assert b"Webhook endpoint is live!" in res.data
+
+@pytest.mark.parametrize("intent, reply", [
+    ("greet", "Hello! 👋 Welcome to the Online Reading Club. How can I help you?"),
+    ("goodbye", "Goodbye! Happy reading 📖"),
+    ("bot_challenge", "I’m a book assistant bot 🤖, here to help you discover books!"),
+    ("unknown_intent", "Sorry, I didn’t get that."),
+])
+def test_canned_replies(client, intent, reply):
+    assert ask(client, intent) == reply
+
+@pytest.mark.parametrize("query_text", [None, 123, ""])
+def test_non_text_query_is_answered_in_english(client, query_text):
+    assert ask(client, "greet", query_text) == "Hello! 👋 Welcome to the Online Reading Club. How can I help you?"
+
+# --------------------------
+# Book lookups
+# --------------------------
+def test_search_book_by_title(client):
+    reply = ask(client, "search_book_by_title", book_title="Encyclopedia")
+    assert reply.startswith("Here is the book 📕 for you!\n📖 Title: Encyclopedia of the Novel\n")
+    assert "📅 Published Date: 08/04/2014" in reply
+    assert ask(client, "search_book_by_title", book_title="zzzz") == "Sorry, I couldn’t find a book titled 'zzzz'."
+    assert ask(client, "search_book_by_title", book_title="") == "Sorry, I didn’t get that."
+
+def test_search_book_by_author(client):
+    assert ask(client, "search_book_by_author", author="paul") == (
+        "📚 Here are some books by Paul:\n1. Encyclopedia of the Novel\n2. Camping & Wilderness Survival\n3. Narnia")
+    assert ask(client, "search_book_by_author", author="Routledge") == "Sorry, I couldn’t find books from Routledge."
+    assert ask(client, "search_book_by_author", author="") == "Please provide an author name."
+
+def test_search_book_by_genre(client):
+    assert ask(client, "search_book_by_genre", genre="Social Science") == (
+        "📖 Found the following books in the 'Social Science' genre:\n"
+        "1. The Seductions of Biography\n2. Reading Is My Window\n3. Harry Potter and Convergence Culture")
+    assert ask(client, "search_book_by_genre", genre="xyzzy") == "Sorry, I couldn’t find books in the xyzzy genre."
+
+@pytest.mark.parametrize("intent, title, reply", [
+    ("ask_number_of_pages", "biography", "📄'The Seductions of Biography' has 234 pages."),
+    ("ask_publish_date", "Seductions", "📅'The Seductions of Biography' was published on 04/02/2016."),
+    ("ask_publisher", "novel", "🏢 Publisher of 'Encyclopedia of the Novel' is Routledge."),
+    ("ask_average_rating", "novel", "⭐'Encyclopedia of the Novel' has an average rating of 3."),
+    ("ask_thumbnail", "novel", "📌 Thumbnail for 'Encyclopedia of the Novel': "
+        "http://books.google.com/books/content?id=FPdRAwAAQBAJ&printsec=frontcover&img=1&zoom=1&edge=curl&source=gbs_api: "),
+    ("ask_number_of_pages", "nope nope", "Sorry, I couldn’t find page count for 'nope nope'."),
+    ("ask_book_description", "nope nope", "Sorry, I couldn’t find a description for 'nope nope'."),
+    ("ask_publish_date", "nope nope", "Sorry, I couldn’t find the published date for 'nope nope'."),
+    ("ask_publisher", "nope nope", "Sorry, I couldn’t find the publisher for 'nope nope'."),
+    ("ask_average_rating", "nope nope", "Sorry, I couldn’t find ratings for 'nope nope'."),
+    ("ask_thumbnail", "nope nope", "Sorry, I couldn’t find a cover for 'nope nope'."),
+])
+def test_title_fields(client, intent, title, reply):
+    assert ask(client, intent, book_title=title) == reply
+
+def test_book_description(client):
+    reply = ask(client, "ask_book_description", book_title="Seductions")
+    assert reply.startswith("📝 Description of 'The Seductions of Biography': The Seductions of Biography is")
+
+def test_recommend_book(client):
+    assert ask(client, "recommend_book", book_title="novel").startswith("I recommend this book 📙 for you:\n📖 Title: ")
+    assert ask(client, "recommend_book", book_title="nope nope") == "Sorry, I didn’t get that."
+
+def test_search_top_rated(client):
+    lines = ask(client, "search_top_rated").split("\n")
+    assert lines[0] == "🏆 Top Rated Books:"
+    assert 1 <= len(lines) - 1 <= 5
+
+# --------------------------
+# Translation
+# --------------------------
+def test_reply_is_translated_back(client):
+    assert ask(client, "ask_publisher", "この本の出版社は？", book_title="novel") == (
+        "[ja] 🏢 Publisher of 'Encyclopedia of the Novel' is Routledge.")
+
+def test_canned_reply_is_translated(client):
+    assert ask(client, "goodbye", "さようなら") == "[ja] Goodbye! Happy reading 📖"
+
+def test_ascii_with_other_punctuation_is_detected(client):
+    import main
+    assert main.safe_detect_language("find me a novel, please.") == "en"
+    assert main.safe_detect_language("Saya cari buku: sejarah") == "id"